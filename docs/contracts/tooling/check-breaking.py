@@ -14,121 +14,192 @@ Usage:
     python3 check-breaking.py                    # Compare HEAD~1 to HEAD
     python3 check-breaking.py --base main        # Compare main to HEAD
     python3 check-breaking.py --output-format github  # Output as GitHub PR comment
+    python3 check-breaking.py --cache-dir .cache/check-breaking  # Reuse parsed base schemas
 """
 
 import argparse
+import contextlib
+import functools
 import json
+import operator
+import os
+import pickle
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, Callable, Iterator
+
+_loads: Callable[[bytes], Any]
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Size cap for the --cache-dir parsed schema cache
+_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Defaults for absent upper/lower bounds
+_POS_INF = float("inf")
+_NEG_INF = float("-inf")
+
+# (keyword, default when absent, old/new comparison that breaks, description)
+_NUMERIC_CHECKS: tuple[tuple[str, float, Callable[[Any, Any], bool], str], ...] = (
+    ("maxLength", _POS_INF, operator.gt, "maxLength decreased"),
+    ("minLength", 0, operator.lt, "minLength increased"),
+    ("maximum", _POS_INF, operator.gt, "maximum decreased"),
+    ("minimum", _NEG_INF, operator.lt, "minimum increased"),
+    ("maxItems", _POS_INF, operator.gt, "maxItems decreased"),
+    ("minItems", 0, operator.lt, "minItems increased"),
+)
+
+
+class GitBlobReader:
+    """Reads blobs through one long-running `git cat-file --batch` process."""
+
+    def __init__(self) -> None:
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        assert self._proc.stdin is not None and self._proc.stdout is not None
+        self._stdin: IO[bytes] = self._proc.stdin
+        self._stdout: IO[bytes] = self._proc.stdout
+
+    def __enter__(self) -> "GitBlobReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def read_all(self, git_ref: str, paths: list[str]) -> Iterator[tuple[str, bytes] | None]:
+        """
+        Yield (sha, content) of the blob at `git_ref:path` for each path, or None if missing.
+
+        All requests are written up front from a background thread, so git
+        resolves later objects while earlier responses are being consumed.
+        """
+        requests = [f"{git_ref}:{path}\n".encode() for path in paths]
+        writer = threading.Thread(target=self._write_requests, args=(requests,))
+        writer.start()
+        try:
+            for _ in requests:
+                yield self._read_response()
+        finally:
+            writer.join()
 
+    def _write_requests(self, requests: list[bytes]) -> None:
+        try:
+            self._stdin.writelines(requests)
+            self._stdin.flush()
+        except BrokenPipeError:
+            pass
+
+    def _read_response(self) -> tuple[str, bytes] | None:
+        # Header is "<sha> <type> <size>", or "<object> missing" on failure.
+        # The object name is echoed verbatim and may itself contain spaces.
+        line = self._stdout.readline()
+        if not line or line.endswith((b" missing\n", b" ambiguous\n")):
+            return None
+
+        sha, object_type, size = line.rstrip(b"\n").rsplit(b" ", 2)
+        content = self._stdout.read(int(size))
+        self._stdout.read(1)  # trailing newline
+        if object_type != b"blob":
+            return None
+        return sha.decode(), content
+
+    def close(self) -> None:
+        try:
+            self._stdin.close()
+        except BrokenPipeError:
+            pass
+        self._proc.wait()
 
-def get_schema_at_ref(schema_path: str, git_ref: str) -> dict | None:
-    """Get schema content at a specific git ref."""
+
+def get_changed_paths(git_ref: str, pathspec: str) -> set[str] | None:
+    """Get paths matching pathspec that differ between git_ref and the working tree."""
     try:
+        # -z leaves non-ASCII paths unquoted so they match the glob results
         result = subprocess.run(
-            ["git", "show", f"{git_ref}:{schema_path}"],
+            ["git", "diff", "-z", "--name-only", git_ref, "--", pathspec],
             capture_output=True,
-            text=True,
             check=True,
         )
-        return json.loads(result.stdout)
-    except (subprocess.CalledProcessError, json.JSONDecodeError):
+    except subprocess.CalledProcessError:
         return None
+    return {os.fsdecode(path) for path in result.stdout.split(b"\0") if path}
 
 
-def is_type_widening(old_type: Any, new_type: Any) -> bool:
-    """Check if type change is widening (non-breaking)."""
-    if old_type == new_type:
-        return True
-
-    # string -> [string, null] is widening
-    if isinstance(new_type, list) and old_type in new_type:
-        return True
-
-    # integer -> number is widening
-    if old_type == "integer" and new_type == "number":
-        return True
-
-    return False
+def removed_enum_values(old_values: list[Any], new_values: list[Any]) -> list[Any]:
+    """Get values of the old enum missing from the new one, in schema order."""
+    try:
+        new_set = frozenset(new_values)
+        return [v for v in old_values if v not in new_set]
+    except TypeError:
+        # Object and array members are unhashable, compare by equality instead
+        return [v for v in old_values if v not in new_values]
 
 
-def check_property_breaking(name: str, old_def: dict, new_def: dict) -> list[str]:
+def check_property_breaking(
+    name: str, old_def: dict[str, Any], new_def: dict[str, Any]
+) -> Iterator[str]:
     """Check a single property for breaking changes."""
-    issues = []
-
-    # Type changes
-    old_type = old_def.get("type")
-    new_type = new_def.get("type")
-    if old_type and new_type and old_type != new_type:
-        if not is_type_widening(old_type, new_type):
-            issues.append(f"BREAKING: '{name}' type changed from {old_type} to {new_type}")
-
-    # String constraints
-    old_max_len = old_def.get("maxLength", float("inf"))
-    new_max_len = new_def.get("maxLength", float("inf"))
-    if old_max_len > new_max_len:
-        issues.append(f"BREAKING: '{name}' maxLength decreased from {old_max_len} to {new_max_len}")
-
-    old_min_len = old_def.get("minLength", 0)
-    new_min_len = new_def.get("minLength", 0)
-    if old_min_len < new_min_len:
-        issues.append(f"BREAKING: '{name}' minLength increased from {old_min_len} to {new_min_len}")
-
-    # Numeric constraints
-    old_max = old_def.get("maximum", float("inf"))
-    new_max = new_def.get("maximum", float("inf"))
-    if old_max > new_max:
-        issues.append(f"BREAKING: '{name}' maximum decreased from {old_max} to {new_max}")
-
-    old_min = old_def.get("minimum", float("-inf"))
-    new_min = new_def.get("minimum", float("-inf"))
-    if old_min < new_min:
-        issues.append(f"BREAKING: '{name}' minimum increased from {old_min} to {new_min}")
+    og = old_def.get
+    ng = new_def.get
+
+    # Type changes, except widening: string -> [string, null], integer -> number
+    old_type = og("type")
+    new_type = ng("type")
+    if (
+        old_type
+        and new_type
+        and old_type != new_type
+        and not (isinstance(new_type, list) and old_type in new_type)
+        and not (old_type == "integer" and new_type == "number")
+    ):
+        yield f"BREAKING: '{name}' type changed from {old_type} to {new_type}"
+
+    # Length, numeric and array bounds
+    for keyword, default, is_tightened, change in _NUMERIC_CHECKS:
+        if keyword not in old_def and keyword not in new_def:
+            # Absent on both sides, the defaults can never compare as tightened
+            continue
+        old_value = og(keyword, default)
+        new_value = ng(keyword, default)
+        if is_tightened(old_value, new_value):
+            yield f"BREAKING: '{name}' {change} from {old_value} to {new_value}"
 
     # Pattern changes
-    old_pattern = old_def.get("pattern")
-    new_pattern = new_def.get("pattern")
+    old_pattern = og("pattern")
+    new_pattern = ng("pattern")
     if old_pattern and new_pattern and old_pattern != new_pattern:
-        issues.append(f"BREAKING: '{name}' pattern changed from '{old_pattern}' to '{new_pattern}'")
+        yield f"BREAKING: '{name}' pattern changed from '{old_pattern}' to '{new_pattern}'"
 
     # Enum changes
     if "enum" in old_def and "enum" in new_def:
-        old_values = set(old_def["enum"])
-        new_values = set(new_def["enum"])
-        removed = old_values - new_values
+        removed = removed_enum_values(old_def["enum"], new_def["enum"])
         if removed:
-            issues.append(f"BREAKING: '{name}' enum values removed: {removed}")
-
-    # Array constraints
-    old_max_items = old_def.get("maxItems", float("inf"))
-    new_max_items = new_def.get("maxItems", float("inf"))
-    if old_max_items > new_max_items:
-        issues.append(f"BREAKING: '{name}' maxItems decreased from {old_max_items} to {new_max_items}")
-
-    old_min_items = old_def.get("minItems", 0)
-    new_min_items = new_def.get("minItems", 0)
-    if old_min_items < new_min_items:
-        issues.append(f"BREAKING: '{name}' minItems increased from {old_min_items} to {new_min_items}")
-
-    return issues
+            yield f"BREAKING: '{name}' enum values removed: {removed}"
 
 
-def check_breaking_changes(old_schema: dict, new_schema: dict) -> list[str]:
+def check_breaking_changes(
+    old_schema: dict[str, Any], new_schema: dict[str, Any]
+) -> Iterator[str]:
     """
-    Returns list of breaking change descriptions, empty if compatible.
+    Yields breaking change descriptions, nothing if compatible.
     """
-    issues = []
-
     # Check required fields
-    old_required = set(old_schema.get("required", []))
-    new_required = set(new_schema.get("required", []))
-    added_required = new_required - old_required
+    old_required = frozenset(old_schema.get("required", []))
+    new_required = frozenset(new_schema.get("required", []))
+    added_required = new_required.difference(old_required)
     if added_required:
-        issues.append(f"BREAKING: New required fields: {added_required}")
+        yield f"BREAKING: New required fields: {set(added_required)}"
 
-    removed_required = old_required - new_required
     # Removing required is non-breaking (loosening)
 
     # Check each property
@@ -137,26 +208,27 @@ def check_breaking_changes(old_schema: dict, new_schema: dict) -> list[str]:
 
     for prop_name, old_def in old_props.items():
         if prop_name not in new_props:
-            issues.append(f"BREAKING: Property '{prop_name}' removed")
+            yield f"BREAKING: Property '{prop_name}' removed"
             continue
 
         new_def = new_props[prop_name]
-        prop_issues = check_property_breaking(prop_name, old_def, new_def)
-        issues.extend(prop_issues)
+        if new_def == old_def:
+            # Unchanged definitions cannot introduce breaking changes
+            continue
+
+        yield from check_property_breaking(prop_name, old_def, new_def)
 
     # Check additionalProperties
     old_additional = old_schema.get("additionalProperties", True)
     new_additional = new_schema.get("additionalProperties", True)
     if old_additional is True and new_additional is False:
-        issues.append("BREAKING: additionalProperties changed from true to false")
+        yield "BREAKING: additionalProperties changed from true to false"
 
     # Check enum at root level
     if "enum" in old_schema and "enum" in new_schema:
-        old_values = set(old_schema["enum"])
-        new_values = set(new_schema["enum"])
-        removed = old_values - new_values
+        removed = removed_enum_values(old_schema["enum"], new_schema["enum"])
         if removed:
-            issues.append(f"BREAKING: Root enum values removed: {removed}")
+            yield f"BREAKING: Root enum values removed: {removed}"
 
     # Check oneOf/anyOf for removed options
     for keyword in ["oneOf", "anyOf"]:
@@ -164,17 +236,105 @@ def check_breaking_changes(old_schema: dict, new_schema: dict) -> list[str]:
             old_count = len(old_schema[keyword])
             new_count = len(new_schema[keyword])
             if new_count < old_count:
-                issues.append(f"BREAKING: {keyword} options reduced from {old_count} to {new_count}")
+                yield f"BREAKING: {keyword} options reduced from {old_count} to {new_count}"
+
 
-    return issues
+def load_base_schema(sha: str, content: bytes, cache_dir: Path | None) -> Any:
+    """Parse a base schema blob, reusing a cached parse keyed by its blob sha."""
+    if cache_dir is None:
+        return _loads(content)
 
+    # Blob shas are content addresses, so cached entries never go stale
+    cache_file = cache_dir / f"{sha}.pkl"
+    try:
+        cached = cache_file.read_bytes()
+    except OSError:
+        cached = None
+
+    if cached is not None:
+        try:
+            schema = pickle.loads(cached)
+        except Exception:
+            # Damaged entry, drop it and fall back to parsing the blob
+            with contextlib.suppress(OSError):
+                cache_file.unlink()
+        else:
+            with contextlib.suppress(OSError):
+                os.utime(cache_file)
+            return schema
+
+    schema = _loads(content)
+    tmp_file = cache_file.with_suffix(f".{threading.get_ident()}.tmp")
+    try:
+        tmp_file.write_bytes(pickle.dumps(schema, protocol=5))
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # Drop the partial write, prune_cache only tracks *.pkl entries
+        with contextlib.suppress(OSError):
+            tmp_file.unlink(missing_ok=True)
+    return schema
+
+
+def prune_cache(cache_dir: Path, max_bytes: int = _CACHE_MAX_BYTES) -> None:
+    """Evict least recently used cache entries until the cache fits in max_bytes."""
+    entries = []
+    for cache_file in cache_dir.glob("*.pkl"):
+        try:
+            stat = cache_file.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, cache_file))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, cache_file in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            cache_file.unlink(missing_ok=True)
+        except OSError:
+            continue
+        total -= size
 
-def main():
+
+def process_schema(
+    schema_file: Path, old_blob: tuple[str, bytes] | None, cache_dir: Path | None = None
+) -> tuple[str, list[str]] | None:
+    """Compare a schema on disk against its base version."""
+    if old_blob is None:
+        # New schema, not a breaking change
+        return None
+    old_sha, old_content = old_blob
+
+    try:
+        new_content = schema_file.read_bytes()
+    except FileNotFoundError:
+        return None
+
+    if new_content == old_content:
+        # Untouched schema, skip parsing entirely
+        return None
+
+    try:
+        old_schema = load_base_schema(old_sha, old_content, cache_dir)
+        new_schema = _loads(new_content)
+    except json.JSONDecodeError:
+        return None
+
+    if new_schema == old_schema:
+        # Formatting-only change
+        return None
+
+    return schema_file.name, list(check_breaking_changes(old_schema, new_schema))
+
+
+def main() -> int:
     parser = argparse.ArgumentParser(description="Detect breaking changes in JSON schemas")
     parser.add_argument("--base", default="HEAD~1", help="Base git ref to compare against")
     parser.add_argument("--head", default="HEAD", help="Head git ref to compare")
     parser.add_argument("--output-format", choices=["text", "github"], default="text",
                         help="Output format")
+    parser.add_argument("--cache-dir", type=Path, default=None,
+                        help="Cache parsed base schemas in this directory (disabled by default)")
     args = parser.parse_args()
 
     # Find all schemas in current HEAD
@@ -183,48 +343,62 @@ def main():
         print("No schemas directory found, skipping breaking change detection")
         return 0
 
-    all_issues = {}
+    all_issues: dict[str, list[str]] = {}
+
+    # Only schemas touched since the base ref can introduce breaking changes
+    changed = get_changed_paths(args.base, "schemas/*.schema.json")
 
+    schema_files = []
+    schema_paths = []
     for schema_file in schema_dir.glob("*.schema.json"):
         schema_path = f"docs/contracts/{schema_file}"
-
-        # Get old and new versions
-        old_schema = get_schema_at_ref(schema_path, args.base)
-
-        try:
-            with open(schema_file) as f:
-                new_schema = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+        if changed is not None and schema_path not in changed:
             continue
+        schema_files.append(schema_file)
+        schema_paths.append(schema_path)
 
-        if old_schema is None:
-            # New schema, not a breaking change
-            continue
-
-        issues = check_breaking_changes(old_schema, new_schema)
-        if issues:
-            all_issues[schema_file.name] = issues
+    cache_dir = args.cache_dir
+    if cache_dir is not None:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            # Unusable cache directory, run without the cache
+            cache_dir = None
+
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with GitBlobReader() as reader, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        old_blobs = reader.read_all(args.base, schema_paths)
+        process = functools.partial(process_schema, cache_dir=cache_dir)
+        for result in executor.map(process, schema_files, old_blobs):
+            if result is None:
+                continue
+            name, issues = result
+            if issues:
+                all_issues[name] = issues
 
     # Output results
     if not all_issues:
         print("  No breaking changes detected.")
-        return 0
-
-    if args.output_format == "github":
-        print("## Breaking Changes Detected")
-        print("")
-        for schema, issues in all_issues.items():
-            print(f"### {schema}")
-            for issue in issues:
-                print(f"- {issue}")
-            print("")
     else:
-        for schema, issues in all_issues.items():
-            print(f"  {schema}:")
-            for issue in issues:
-                print(f"    - {issue}")
-
-    return 1
+        out: list[bytes] = []
+        if args.output_format == "github":
+            out.append(b"## Breaking Changes Detected\n\n")
+            for schema, issues in all_issues.items():
+                out.append(f"### {schema}\n".encode())
+                out.extend(f"- {issue}\n".encode() for issue in issues)
+                out.append(b"\n")
+        else:
+            for schema, issues in all_issues.items():
+                out.append(f"  {schema}:\n".encode())
+                out.extend(f"    - {issue}\n".encode() for issue in issues)
+        sys.stdout.buffer.writelines(out)
+    sys.stdout.flush()
+
+    # Evict only once the report is out, so cache upkeep cannot lose it
+    if cache_dir is not None:
+        prune_cache(cache_dir)
+
+    return 1 if all_issues else 0
 
 
 if __name__ == "__main__":
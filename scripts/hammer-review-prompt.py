@@ -38,4 +38,5 @@ prompt = (
     "- Use git diff or git show to reference specific files/lines where possible.\n"
 )
 
-print(base64.b64encode(prompt.encode("utf-8")).decode("utf-8"))
+sys.stdout.buffer.write(base64.b64encode(prompt.encode("utf-8")))
+sys.stdout.buffer.write(b"\n")